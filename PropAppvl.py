@@ -23,6 +23,7 @@
 # PropAppvl(BBox, SatFunc, NSeats)
 # Args: ballot-box object
 # Returns: list of (NSeats) candidates which gave the most satisfaction
+# Compiled with Numba if it is available; otherwise, searched with NumPy
 #
 # Sequential proportional approval voting
 # Reweighted approval voting
@@ -60,12 +61,31 @@
 # (Candidates, Weights of ballots, Ballots)
 # Ballots: indexed by (which ballot, candidate)
 #
+# Array form: BallotBox(Cands, Wts, Votes)
+# Wts: NumPy array, Votes: NumPy array with shape (number of ballots, number of candidates)
+# Votes are stored as bytes (int8) if they are small enough whole numbers
+# Unpacks and indexes like the tuple form. CandListsToBBox() makes one,
+# and the algorithms convert tuple ballot boxes to it.
+# ArrayBBox(BBox)
+# Args: ballot-box object
+# Returns: array form, or None if it is not a ballot box
+#
+# Merge identical ballots, adding up their weights:
+# MergeBallots(BBox)
+# Args: ballot-box object
+# Returns: array form, with the merged ballots in order of first appearance
+# CandListsToBBox() does this for its ballots.
+#
 # Check it (returns boolean):
 # IsBBox(BBox)
 #
 # Check on whether the votes are pure approval votes (0 or 1) (returns boolean):
 # IsBBoxApproval(BBox)
 #
+# An array-form ballot box is checked when it is made, and remembers
+# whether its votes are pure approval (BBox.IsApproval),
+# so passing one to several algorithms checks it only once.
+#
 #
 # Highest-average weight parameters:
 #
@@ -87,34 +107,127 @@
 # HighAvgSatisfy(n, f)
 # Args: number, parameter
 #
+# Tables of them for 0 to MaxN, as NumPy arrays:
+# HighAvgWeightTable(MaxN, f)
+# HighAvgSatisfyTable(MaxN, f)
+# Args: largest number, parameter
+#
+# The algorithms accept such a table in place of a satisfaction or weight function,
+# so it can be made once and used for several of them.
+# A table made for MaxN = (number of candidates) does for PropAppvl and ElimPropAppvl.
+# SeqPropAppvl looks up the sum of the votes on each ballot,
+# so its table must reach the largest such sum,
+# and it needs votes that are nonnegative integers; for other rated votes, use a function.
+#
+
+from dataclasses import dataclass
+from itertools import combinations, islice
+from functools import cache, cached_property
+
+import numpy as np
 
-from itertools import combinations
-from functools import cache
-from operator import itemgetter
+# Numba is optional; without it, the kernels run as plain Python,
+# and PropAppvl uses a NumPy search instead of its kernel
+try:
+	from numba import njit
+	HaveNumba = True
+except ImportError:
+	HaveNumba = False
+	def njit(*args, **kwargs):
+		if len(args) == 1 and callable(args[0]): return args[0]
+		return lambda func: func
 
 
 TotalText = "(Total)"
 
 
+# Ballot box as arrays, one row of votes for each ballot
+# Checked when made, so the algorithms need not check it again
+@dataclass(frozen=True, eq=False)
+class BallotBox:
+	Cands: tuple
+	Wts: np.ndarray
+	Votes: np.ndarray
+	
+	def __post_init__(self):
+		if self.Wts.ndim != 1 or self.Votes.ndim != 2 or \
+			self.Votes.shape != (len(self.Wts), len(self.Cands)):
+			raise ValueError("Need one row of votes per weight, one column per candidate")
+	
+	# Are the ballots pure approval?
+	@cached_property
+	def IsApproval(self):
+		return bool(np.all((self.Votes == 0) | (self.Votes == 1)))
+	
+	# Unpack and index like the tuple form
+	def __iter__(self):
+		return iter((self.Cands, self.Wts, self.Votes))
+	
+	def __getitem__(self, ix):
+		return (self.Cands, self.Wts, self.Votes)[ix]
+	
+	def __len__(self):
+		return 3
+	
+	# Column-major copy of the votes, for taking candidates' columns
+	@cached_property
+	def CandVotes(self):
+		return np.asfortranarray(self.Votes)
+
+
 # Check the ballot box
 def IsBBox(BBox):
+	if isinstance(BBox, BallotBox): return True
 	if len(BBox) != 3: return False
 	Cands, Wts, Votes = BBox
 	NCands = len(Cands)
 	NWts = len(Wts)
 	if len(Votes) != NWts: return False
+	if isinstance(Votes, np.ndarray):
+		return Votes.ndim == 2 and Votes.shape[1] == NCands
 	for Vote in Votes:
 		if len(Vote) != len(Cands): return False
 	return True
 
 # Are the ballots pure approval?
 def IsBBoxApproval(BBox):
-	if not IsBBox(BBox): return False
+	BBox = ArrayBBox(BBox)
+	if BBox is None: return False
+	return BBox.IsApproval
+
+# Ballot box in array form
+def ArrayBBox(BBox):
+	if isinstance(BBox, BallotBox): return BBox
+	if not IsBBox(BBox): return None
 	Cands, Wts, Votes = BBox
-	for Vote in Votes:
-		for IndVote in Vote:
-			if IndVote not in (0,1): return False
-	return True
+	Votes = np.asarray(Votes).reshape(len(Wts), len(Cands))
+	# Approval and typical rated votes fit in a byte each,
+	# even if they were given as floats
+	if Votes.dtype.kind in 'buif' and np.all((Votes >= -128) & (Votes <= 127)):
+		if Votes.dtype.kind != 'f' or np.all(Votes == np.trunc(Votes)):
+			Votes = Votes.astype(np.int8)
+	# No ballots: no weights to make the sums floats
+	Wts = np.asarray(Wts)
+	if len(Wts) == 0: Wts = Wts.astype(int)
+	return BallotBox(tuple(Cands), Wts, Votes)
+
+# Merge identical ballots, adding up their weights
+def MergeBallots(BBox):
+	BBox = ArrayBBox(BBox)
+	if BBox is None: return None
+	Cands, Wts, Votes = BBox
+	
+	Uniq, First, Inverse = np.unique(Votes, axis=0,
+		return_index=True, return_inverse=True)
+	
+	# Keep the order in which the ballots first appear
+	Order = np.argsort(First)
+	Rank = np.empty_like(Order)
+	Rank[Order] = np.arange(len(Order))
+	
+	NewWts = np.zeros(len(Order), dtype=Wts.dtype)
+	np.add.at(NewWts, Rank[Inverse.ravel()], Wts)
+	return BallotBox(Cands, NewWts, Votes[First[Order]])
 
 
 # Candidate-list ballots to standard format
@@ -130,16 +243,13 @@ def CandListsToBBox(BLists):
 	for k, c in enumerate(CList):
 		CLIxs[c] = k
 	
-	Wts = []
-	Blts = []
-	for Wt, CL in BLists:
-		Vals = len(CList)*[0]
+	Wts = np.array([Wt for Wt, CL in BLists])
+	Blts = np.zeros((len(BLists), len(CList)), dtype=np.int8)
+	for k, (Wt, CL) in enumerate(BLists):
 		for c in CL:
-			Vals[CLIxs[c]] = 1
-		Wts.append(Wt)
-		Blts.append(tuple(Vals))
+			Blts[k, CLIxs[c]] = 1
 	
-	return (tuple(CList), tuple(Wts), tuple(Blts))
+	return MergeBallots(BallotBox(tuple(CList), Wts, Blts))
 
 
 # Highest-averages weighting
@@ -153,22 +263,61 @@ def HighAvgWeight(i, f):
 def HighAvgSatisfy(n, f):
 	return sum(map(lambda i: HighAvgWeight(i, f), range(0,n+1)))
 
+# Highest-averages weighting for 0 to MaxN
+def HighAvgWeightTable(MaxN, f):
+	if f == None: return (np.arange(MaxN+1) == 0).astype(float)
+	else: return 1./(1. + f*np.arange(MaxN+1))
+
+# Highest-averages satisfaction function for 0 to MaxN
+def HighAvgSatisfyTable(MaxN, f):
+	return np.cumsum(HighAvgWeightTable(MaxN, f))
+
+# Weighted column sums of the ballots, starting from Initial
+# and adding the ballots in order,
+# so a column's sum does not depend on which other columns are taken with it
+def WtdColSums(Wts, Votes, Initial=0):
+	Prods = Wts[:,None]*Votes
+	if len(Prods) == 0: return Prods.sum(axis=0) + Initial
+	Prods[0] += Initial
+	return np.cumsum(Prods, axis=0, out=Prods)[-1]
+
+# Order of candidates by score, best first, for the results
+# Stable, so tied candidates stay in their original order
+def RankOrder(Scores, Reverse):
+	return np.argsort(-Scores if Reverse else Scores, kind='stable')
+
+# Table of a function's values from 0 to MaxN,
+# for looking up inside the algorithms' loops
+# The function may already be a table
+def FuncTable(Func, MaxN):
+	if isinstance(Func, np.ndarray):
+		if len(Func) <= MaxN:
+			raise ValueError(f"Table has {len(Func)} values, needs {MaxN+1} (0 to {MaxN})")
+		return Func[:MaxN+1].astype(float)
+	return np.array([Func(n) for n in range(MaxN+1)], dtype=float)
+
 
 # Approval voting
 def Approval(BBox):
-	if not IsBBox(BBox) return None
-	Cands, Wts, Votes = BBox
-	NCands = len(Cands)
+	BBox = ArrayBBox(BBox)
+	if BBox is None: return None
+	Cands, W, V = BBox
 	
-	Sums = NCands*[0]
-	for wt, vts in zip(Wts,Votes):
-		for ix, vt in enumerate(vts):
-			Sums[ix] += wt*vt
+	# One weighted column sum over the whole ballot matrix.
+	# Integer sums are exact in any order; others are kept in ballot order,
+	# so that tied candidates stay tied.
+	if W.dtype.kind in 'bui' and V.dtype.kind in 'bui':
+		Sums = W @ V
+	else:
+		Sums = WtdColSums(W, V)
 	
-	TotWts = sum(Wts)
+	TotWts = sum(W.tolist())
 	
-	csms = list(zip(Cands,Sums))
-	csms.sort(key=itemgetter(1), reverse=True)
+	# Stable, so tied candidates stay in their original order
+	# Python numbers, so exact weights like Fraction come back as they went in
+	Order = RankOrder(Sums, True)
+	SumList = Sums.tolist()
+	csms = [(Cands[ix], SumList[ix]) for ix in Order]
 	csms += [(TotalText,TotWts)]
 	
 	return tuple(csms)
@@ -176,42 +325,177 @@ def Approval(BBox):
 
 # Satisfaction approval voting
 def SatAppvl(BBox):
-	if not IsBBox(BBox) return None
-	Cands, Wts, Votes = BBox
-	NCands = len(Cands)
+	BBox = ArrayBBox(BBox)
+	if BBox is None: return None
+	Cands, W, V = BBox
 	
-	NewWts = []
-	for wt, vts in zip(Wts,Votes):
-		VoteSum = sum(vts)
-		newwt = wt/VoteSum if VoteSum != 0 else 0
-		NewWts.append(newwt)
+	# Ballots with no votes get zero weight; the others are never divided by zero
+	VoteSums = V.sum(axis=1)
+	NewWts = np.zeros(len(W), dtype=np.result_type(W.dtype, float))
+	np.divide(W, VoteSums, out=NewWts, where=VoteSums != 0)
 	
-	NewBBox = (Cands, tuple(NewWts), Votes)
+	NewBBox = BallotBox(Cands, NewWts, V)
 	
 	return Approval(NewBBox)
 
 
+# Approval ballots as bitmasks:
+# one row of 64-bit words for each ballot, with candidate k at bit k
+def BallotMasks(Votes):
+	V = np.asarray(Votes, dtype=np.uint8)
+	NBallots, NCands = V.shape
+	NWords = max((NCands + 63)//64, 1)
+	Bytes = np.zeros((NBallots, 8*NWords), dtype=np.uint8)
+	Bytes[:, :(NCands + 7)//8] = np.packbits(V, axis=1, bitorder='little')
+	return Bytes.view('<u8').astype(np.uint64)
+
+# Bit for a candidate in its mask word
+@njit(cache=True)
+def CandBit(ix):
+	return np.uint64(1) << np.uint64(ix & 63)
+
+# Number of bits set in a 64-bit word
+# LLVM recognizes this form and compiles it to a POPCNT instruction
+@njit(cache=True)
+def PopCount(x):
+	x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+	x = (x & np.uint64(0x3333333333333333)) + \
+		((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+	x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+	return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+# Total satisfaction with a committee, given as a mask
+@njit(cache=True)
+def CommitteeSatisfaction(Masks, Wts, SatTable, Comm):
+	NBallots, NWords = Masks.shape
+	SumSats = 0.
+	for b in range(NBallots):
+		Hits = 0
+		for w in range(NWords):
+			Hits += PopCount(Masks[b, w] & Comm[w])
+		SumSats += Wts[b]*SatTable[Hits]
+	return SumSats
+
+# Upper bound on the total satisfaction with any committee that extends
+# the one in Comm with NLeft more members, taken from candidates Start on.
+# Each ballot can at most gain its approvals of those candidates,
+# so the bound is valid for non-decreasing satisfaction functions.
+@njit(cache=True)
+def CommitteeBound(Masks, Wts, SatTable, Comm, Start, NLeft):
+	NBallots, NWords = Masks.shape
+	Rest = np.zeros(NWords, np.uint64)
+	for w in range(NWords):
+		if Start <= 64*w:
+			Rest[w] = ~np.uint64(0)
+		elif Start < 64*(w+1):
+			Rest[w] = ~(CandBit(Start) - np.uint64(1))
+	
+	Bound = 0.
+	for b in range(NBallots):
+		Hits = 0
+		Avail = 0
+		for w in range(NWords):
+			Hits += PopCount(Masks[b, w] & Comm[w])
+			Avail += PopCount(Masks[b, w] & Rest[w])
+		Bound += Wts[b]*SatTable[Hits + min(Avail, NLeft)]
+	return Bound
+
+# Proportional approval voting: branch-and-bound search for the best committee
+# Depth-first over the committees in lexicographic order,
+# skipping every extension of a partial committee whose bound
+# cannot beat the best committee so far
+@njit(cache=True)
+def PropAppvlKernel(Masks, Wts, SatTable, NCands, NSeats, Prune):
+	Comm = np.zeros(Masks.shape[1], np.uint64)
+	Ixs = np.zeros(NSeats, np.int64)
+	BestIxs = np.zeros(NSeats, np.int64)
+	BestSumSats = 0.
+	Found = False
+	
+	Depth = 0
+	while Depth >= 0:
+		ix = Ixs[Depth]
+		if ix > NCands - NSeats + Depth:
+			# No more candidates for this seat: back up to the previous one
+			Depth -= 1
+			if Depth >= 0:
+				Comm[Ixs[Depth] >> 6] ^= CandBit(Ixs[Depth])
+				Ixs[Depth] += 1
+			continue
+		
+		Comm[ix >> 6] |= CandBit(ix)
+		if Depth == NSeats - 1:
+			SumSats = CommitteeSatisfaction(Masks, Wts, SatTable, Comm)
+			if not Found or SumSats > BestSumSats:
+				Found = True
+				BestSumSats = SumSats
+				BestIxs[:] = Ixs
+			Descend = False
+		elif Prune and Found:
+			Bound = CommitteeBound(Masks, Wts, SatTable, Comm, ix + 1,
+				NSeats - Depth - 1)
+			Descend = Bound > BestSumSats
+		else:
+			Descend = True
+		
+		if Descend:
+			Depth += 1
+			Ixs[Depth] = ix + 1
+		else:
+			Comm[ix >> 6] ^= CandBit(ix)
+			Ixs[Depth] += 1
+	
+	return BestIxs
+
+
+# Proportional approval voting without Numba:
+# scores the committees in lexicographic order, a batch at a time
+def PropAppvlNumPy(Votes, Wts, SatTable, NSeats):
+	NBallots, NCands = Votes.shape
+	# About a million votes looked at in each batch
+	BatchSize = max(2**20 // max(NBallots*NSeats, 1), 1)
+	
+	Combs = combinations(range(NCands), NSeats)
+	BestIxs = None
+	BestSumSats = None
+	while True:
+		Batch = np.array(list(islice(Combs, BatchSize)), dtype=np.intp)
+		if len(Batch) == 0: break
+		Hits = Votes[:, Batch].sum(axis=2)
+		SumSats = WtdColSums(Wts, SatTable[Hits])
+		k = SumSats.argmax()
+		if BestIxs is None or SumSats[k] > BestSumSats:
+			BestIxs = Batch[k]
+			BestSumSats = SumSats[k]
+	
+	return BestIxs
+
+
 # Proportional approval voting
 # Needs a ballot box, a satisfaction function,
 # and the number of seats
 def PropAppvl(BBox, SatFunc, NSeats):
-	if not IsBBoxApproval(BBox): return None
+	BBox = ArrayBBox(BBox)
+	if BBox is None or not BBox.IsApproval: return None
 	Cands, Wts, Votes = BBox
 	NCands = len(Cands)
 	if NSeats > NCands: return None
+	if NSeats == 0: return ()
 	
-	BestIxs = None
-	BestSumSat = None
-	for ixs in combinations(list(range(NCands)), NSeats):
-		SumSats = 0
-		for wt, vts in zip(Wts,Votes):
-			SumSats += wt*SatFunc(sum( (vts[ix] for ix in ixs) ))
-		if BestIxs == None:
-			BestIxs = ixs
-			BestSumSats = SumSats
-		elif SumSats > BestSumSats:
-			BestIxs = ixs
-			BestSumSats = SumSats
+	# The votes are 0 or 1, so a ballot's satisfaction depends only on
+	# how many of the committee's members it approves
+	SatTable = FuncTable(SatFunc, NSeats)
+	
+	# Pruning needs satisfaction that never decreases with more approved
+	# members, and ballots that never count against a committee
+	W = Wts.astype(float)
+	Prune = bool(np.all(np.diff(SatTable) >= 0) and np.all(W >= 0))
+	
+	if HaveNumba:
+		BestIxs = PropAppvlKernel(BallotMasks(Votes), W, SatTable,
+			NCands, NSeats, Prune)
+	else:
+		BestIxs = PropAppvlNumPy(Votes, W, SatTable, NSeats)
 	
 	return tuple( (Cands[ix] for ix in BestIxs) )
 
@@ -220,42 +504,57 @@ def PropAppvl(BBox, SatFunc, NSeats):
 # Needs a ballot box, a weight function,
 # and the number of seats
 def SeqPropAppvl(BBox, WtFunc):
-	if not IsBBox(BBox) return None
-	Cands, Wts, Votes = BBox
+	BBox = ArrayBBox(BBox)
+	if BBox is None: return None
+	Cands, W, V = BBox
 	NCands = len(Cands)
 	
-	Cands = list(Cands)
-	Votes = tuple(map(list,Votes))
-	NBallots = len(Wts)
-	Victs = NBallots*[0]
+	# The victory counts are sums of votes, so if the votes are
+	# nonnegative integers, the weights can be looked up
+	if V.dtype.kind in 'bui' and np.all(V >= 0):
+		WtTable = FuncTable(WtFunc, int(V.sum(axis=1).max(initial=0)))
+		VictWts = lambda vcs: WtTable[vcs]
+	elif isinstance(WtFunc, np.ndarray):
+		raise ValueError("A weight table needs votes that are nonnegative integers")
+	else:
+		VictWts = lambda vcs: \
+			np.array([WtFunc(vc) for vc in vcs.tolist()], dtype=float)
+	
+	# The sums are kept up to date, rather than found anew each round
+	Victs = np.zeros_like(V.sum(axis=1))
+	AdjWts = W*VictWts(Victs)
+	Sums = WtdColSums(AdjWts, V)
+	Alive = np.ones(NCands, dtype=bool)
 	CandRes = []
 	for ic in range(NCands):
-		NCands = len(Cands)
-		Sums = NCands*[0]
-		TotWts = 0
-		for wt, vc, vts in zip(Wts,Victs,Votes):
-			adjwt = wt*WtFunc(vc)
-			TotWts += adjwt
-			for ix,vt in enumerate(vts):
-				Sums[ix] += adjwt*vt
-		
-		# Sort by the score to find the winner
-		# Include the index to find the winner's index
-		csms = zip(Cands,Sums,range(NCands))
-		csms = list(sorted(csms,key=itemgetter(1),reverse=True))
-		(mxcand, mxvts, mxix) = csms[0]
+		TotWts = sum(AdjWts.tolist())
 		
-		for k in range(NBallots):
-			Victs[k] += Votes[k][mxix]
+		# Find the winner
+		LiveIxs = np.flatnonzero(Alive)
+		LiveSums = Sums[LiveIxs]
+		mxix = LiveIxs[LiveSums.argmax()].item()
 		
-		# Append the candidates with their scores
-		csms = [cm[0:2] for cm in csms] + [(TotalText,TotWts)]
+		# Append the candidates with their scores, sorted
+		Order = RankOrder(LiveSums, True)
+		csms = [(Cands[ix], sm) for ix, sm in
+			zip(LiveIxs[Order].tolist(), LiveSums[Order].tolist())]
+		csms += [(TotalText,TotWts)]
 		CandRes.append(tuple(csms))
 		
-		# Delete the winner
-		del Cands[mxix]
-		for vts in Votes:
-			del vts[mxix]
+		# The last winner leaves no one to reweight for
+		if ic == NCands-1: break
+		
+		# Retire the winner
+		Alive[mxix] = False
+		
+		# Only the ballots that voted for the winner get new weights,
+		# so the sums change only by those ballots' changes of weight
+		Hits = np.flatnonzero(BBox.CandVotes[:,mxix])
+		Victs[Hits] += V[Hits,mxix]
+		OldAdjWts = AdjWts[Hits]
+		AdjWts[Hits] = W[Hits]*VictWts(Victs[Hits])
+		LiveIxs = np.flatnonzero(Alive)
+		Sums[LiveIxs] += (AdjWts[Hits] - OldAdjWts) @ V[Hits][:,LiveIxs]
 	
 	return tuple(CandRes)
 
@@ -263,93 +562,97 @@ def SeqPropAppvl(BBox, WtFunc):
 # Needs a ballot box, a weight function,
 # and the direction of sorting (reverse: True, normal: False)
 def ElimPropAppvl(BBox, SatFunc, SortDir):
-	if not IsBBoxApproval(BBox): return None
-	Cands, Wts, Votes = BBox
+	BBox = ArrayBBox(BBox)
+	if BBox is None or not BBox.IsApproval: return None
+	Cands, W, V = BBox
 	NCands = len(Cands)
 	
-	Cands = list(Cands)
-	Votes = tuple(map(list,Votes))
-	TotWts = sum(Wts)
+	# Each ballot approves at most NCands-1 of the others
+	SatTable = FuncTable(SatFunc, NCands-1)
+	
+	Alive = np.ones(NCands, dtype=bool)
+	
+	TotWts = sum(W.tolist())
 	CandRes = []
 	for ic in range(NCands):
-		NCands = len(Cands)
-		Sums = NCands*[0]
-		for wt, vts in zip(Wts,Votes):
-			for ix in range(NCands):
-				Sums[ix] += wt*SatFunc(sum(vts[:ix]) + sum(vts[ix+1:]))
+		LiveIxs = np.flatnonzero(Alive)
+		
+		# Without a candidate, a ballot approves its total less that candidate
+		LiveVotes = BBox.CandVotes[:,LiveIxs]
+		VoteSums = LiveVotes.sum(axis=1, keepdims=True)
+		Sats = SatTable[VoteSums - LiveVotes]
+		Sums = WtdColSums(W, Sats)
 		
-		# Sort by the score to find the loser
-		# Include the index to find the loser's index
-		csms = zip(Cands,Sums,range(NCands))
-		csms = list(sorted(csms,key=itemgetter(1),reverse=SortDir))
-		(mxcand, mxvts, mxix) = csms[0]
+		# Find the loser
+		mxix = LiveIxs[Sums.argmax() if SortDir else Sums.argmin()].item()
 		
-		# Append the candidates with their scores
-		csms = [cm[0:2] for cm in csms] + [(TotalText,TotWts)]
+		# Append the candidates with their scores, sorted
+		Order = RankOrder(Sums, SortDir)
+		csms = [(Cands[ix], sm) for ix, sm in
+			zip(LiveIxs[Order].tolist(), Sums[Order].tolist())]
+		csms += [(TotalText,TotWts)]
 		CandRes.append(tuple(csms))
 		
-		# Delete the winner
-		del Cands[mxix]
-		for vts in Votes:
-			del vts[mxix]
+		# Retire the loser
+		Alive[mxix] = False
 	
 	return tuple(CandRes)
 
 
 def Phragmen(BBox):
-	if not IsBBoxApproval(BBox): return None
-	Cands, Wts, Votes = BBox
+	BBox = ArrayBBox(BBox)
+	if BBox is None or not BBox.IsApproval: return None
+	Cands, W, V = BBox
 	NCands = len(Cands)
 	
 	# Precalculate voting-power denominator reciprocals
-	vpdnm = NCands*[0]
-	
-	# Find the denominators
-	for wt, vts in zip(Wts, Votes):
-		for k in range(NCands):
-			vpdnm[k] += wt*vts[k]
-	
-	# Take their reciprocals
-	vdrcp = [1/float(x) for x in vpdnm]
+	# A candidate with no votes has infinite voting power
+	vpdnm = WtdColSums(W, V)
+	with np.errstate(divide='ignore'):
+		vdrcp = 1/vpdnm.astype(float)
 	
 	# The ballot loads (original Swedish: belastning)
-	bloads = len(Wts)*[0]
+	bloads = np.zeros(len(W))
 	
-	Cands = list(Cands)
-	Votes = tuple(map(list,Votes))
-	TotWts = sum(Wts)	
+	# The voting-power numerators are kept up to date,
+	# rather than found anew each round.
+	# With no loads, they all start at 1.
+	vpnum = np.ones(NCands)
+	
+	Alive = np.ones(NCands, dtype=bool)
+	TotWts = sum(W.tolist())
 	CandRes = []
 	for ic in range(NCands):
-		# Find the voting powers
-		NCands = len(Cands)
-		vpnum = NCands*[1]
+		LiveIxs = np.flatnonzero(Alive)
 		
-		for bl, wt, vts in zip(bloads, Wts, Votes):
-			blwt = bl*wt
-			for k in range(NCands):
-				vpnum[k] += blwt*vts[k]
-		
-		vpwr = [rd*nm for nm, rd in zip(vpnum, vdrcp)]
+		# Find the voting powers
+		vpwr = vdrcp[LiveIxs]*vpnum[LiveIxs]
 		
-		# Sort by the score to find the winner
-		# Include the index to find the winner's index
-		csms = zip(Cands,vpwr,range(NCands))
-		csms = list(sorted(csms,key=itemgetter(1),reverse=False))
-		(mncand, mnvp, mnix) = csms[0]
+		# Find the winner
+		mnlive = vpwr.argmin()
+		mnix = LiveIxs[mnlive].item()
+		mnvp = vpwr[mnlive].item()
 		
-		# Update the ballot loads
-		bloads = [ mnvp if vts[mnix] != 0 else bl \
-			for vts, bl in zip(Votes, bloads)]
+		# Update the loads of the ballots that voted for the winner
+		Hits = np.flatnonzero(BBox.CandVotes[:,mnix])
+		OldLoads = bloads[Hits]
+		bloads[Hits] = mnvp
 		
-		# Append the candidates with their scores
-		csms = [(cm[0],1./cm[1]) for cm in csms] + [(TotalText, TotWts)]
+		# Append the candidates with their scores, sorted
+		Order = RankOrder(vpwr, False)
+		csms = [(Cands[k], 1./vp) for k, vp in
+			zip(LiveIxs[Order].tolist(), vpwr[Order].tolist())]
+		csms += [(TotalText, TotWts)]
 		CandRes.append(tuple(csms))
+		# The last winner leaves no one to recount for
+		if ic == NCands-1: break
 		
-		# Delete the winner
-		del Cands[mnix]
-		del vdrcp[mnix]
-		for vts in Votes:
-			del vts[mnix]
+		# Retire the winner
+		Alive[mnix] = False
+		
+		# The numerators change only by the reloaded ballots' changes of load
+		LiveIxs = np.flatnonzero(Alive)
+		vpnum[LiveIxs] += ((mnvp - OldLoads)*W[Hits].astype(float)) @ V[Hits][:,LiveIxs]
 	
 	return tuple(CandRes)
 	
@@ -366,21 +669,27 @@ def printlist(res):
 	for r in res: print(r)
 
 def DumpAll(BBox, NSeats):
+	# Convert and check once, for all the algorithms
+	BBox = ArrayBBox(BBox)
 	print(f"Number of Seats: {NSeats}")
 	print("Approval")
 	print(Approval(BBox))
 	print("Satisfaction Approval")
 	print(SatAppvl(BBox))
+	Cands, Wts, Votes = BBox
 	for fac in HAFactorList:
+		# Made once for each factor, and shared by the algorithms
+		WtTable = HighAvgWeightTable(len(Cands), fac)
+		SatTable = HighAvgSatisfyTable(len(Cands), fac)
 		print(HAFactorDesc[fac])
 		print("Plain PAV")
-		print(PropAppvl(BBox, lambda n: HighAvgSatisfy(n,fac), NSeats))
+		print(PropAppvl(BBox, SatTable, NSeats))
 		print("Sequential PAV")
-		printlist(SeqPropAppvl(BBox, lambda n: HighAvgWeight(n,fac)))
+		printlist(SeqPropAppvl(BBox, WtTable))
 		print("Eliminative PAV - Rev")
-		printlist(ElimPropAppvl(BBox, lambda n: HighAvgWeight(n,fac), True))
+		printlist(ElimPropAppvl(BBox, WtTable, True))
 		print("Eliminative PAV - Norm")
-		printlist(ElimPropAppvl(BBox, lambda n: HighAvgWeight(n,fac), False))
+		printlist(ElimPropAppvl(BBox, WtTable, False))
 	print("Phragmen")
 	printlist(Phragmen(BBox))
 	print()